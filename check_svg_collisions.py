@@ -13,18 +13,33 @@ Collision rules:
 
 import sys
 import os
+import hashlib
+import shelve
+from concurrent.futures import ProcessPoolExecutor
 
-from svg_parser import extract_elements
+import cairocffi
+
+from svg_parser import extract_elements, extract_elements_from_string
 from collision_rules import check_collisions
+from measure_text import measure_text
 
 
 def check_file(svg_path: str) -> dict:
     """Check a single SVG file for collisions."""
-    texts, rects, lines, polygons, rendered_markers, markers, missing_ids = extract_elements(svg_path)
+    return _check_elements(extract_elements(svg_path), os.path.basename(svg_path))
+
+
+def check_string(svg_text: str, name: str = '<string>') -> dict:
+    """Check SVG markup held in memory for collisions. name is reported as the result's file."""
+    return _check_elements(extract_elements_from_string(svg_text), name)
+
+
+def _check_elements(elements: tuple, file_name: str) -> dict:
+    texts, rects, lines, polygons, rendered_markers, markers, missing_ids = elements
     issues, warnings = check_collisions(texts, rects, lines, polygons, rendered_markers, markers)
 
     return {
-        'file': os.path.basename(svg_path),
+        'file': file_name,
         'texts': len(texts),
         'rects': len(rects),
         'lines': len(lines),
@@ -35,13 +50,87 @@ def check_file(svg_path: str) -> dict:
     }
 
 
+# Sources whose code decides the results; any change to them invalidates the cache
+CHECKER_SOURCES = ('check_svg_collisions.py', 'svg_parser.py', 'collision_rules.py',
+                   'geometry.py', 'spatial_index.py', 'measure_text.py')
+CACHE_VERSION_KEY = '__checker_version__'
+CACHE_FONTS_KEY = '__font_fingerprint__'
+# Measured in every font family the cached files use, to notice installed or replaced fonts
+FONT_PROBE = 'Hamburgefonstiv 0123456789 –'
+FONT_PROBE_SIZE = 100.0
+
+
+def checker_version() -> str:
+    """Hash of the checker's sources and the Cairo version used for text metrics."""
+    digest = hashlib.blake2b(digest_size=16)
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in CHECKER_SOURCES:
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            digest.update(f.read())
+    digest.update(cairocffi.cairo_version_string().encode())
+    return digest.hexdigest()
+
+
+def font_fingerprint(font_families) -> dict:
+    """Map each font family to the metrics of FONT_PROBE, which change when fontconfig picks another font."""
+    return {family: measure_text(FONT_PROBE, family, FONT_PROBE_SIZE) for family in font_families}
+
+
+def file_stamp(svg_path: str) -> str:
+    """Changes whenever the file's mtime or size changes."""
+    stat = os.stat(svg_path)
+    return f"{stat.st_mtime_ns}|{stat.st_size}"
+
+
+def check_files(svg_paths: list, cache_path: str = None) -> list:
+    """
+    Check several SVG files, spreading them over worker processes. Results keep input order.
+    With cache_path, results for unchanged files are reused from that shelve file.
+    The shelve holds one (stamp, result) entry per file path, and is cleared when the checker
+    or the fonts behind any font family used by the cached files change.
+    """
+    if cache_path is None:
+        return _check_uncached(svg_paths)
+
+    with shelve.open(cache_path) as cache:
+        version = checker_version()
+        fonts = cache.get(CACHE_FONTS_KEY, {})
+        if cache.get(CACHE_VERSION_KEY) != version or font_fingerprint(fonts) != fonts:
+            cache.clear()
+            cache[CACHE_VERSION_KEY] = version
+            fonts = {}
+        keys = {path: os.path.abspath(path) for path in svg_paths}
+        stamps = {path: file_stamp(path) for path in svg_paths}
+        stale = [path for path in svg_paths if cache.get(keys[path], (None,))[0] != stamps[path]]
+        for path, (result, font_families) in zip(stale, _check_uncached(stale, _check_file_and_fonts)):
+            cache[keys[path]] = (stamps[path], result)
+            fonts.update(font_fingerprint(font_families - fonts.keys()))
+        cache[CACHE_FONTS_KEY] = fonts
+        return [cache[keys[path]][1] for path in svg_paths]
+
+
+def _check_file_and_fonts(svg_path: str) -> tuple:
+    """check_file, also returning the set of font families the file's text uses."""
+    elements = extract_elements(svg_path)
+    return _check_elements(elements, os.path.basename(svg_path)), {text.font_family for text in elements[0]}
+
+
+def _check_uncached(svg_paths: list, check=check_file) -> list:
+    if len(svg_paths) < 2:
+        return [check(path) for path in svg_paths]
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(check, svg_paths))
+
+
 def main():
     verbose = False
+    cache_path = None
     files = []
 
-    for arg in sys.argv[1:]:
+    args = iter(sys.argv[1:])
+    for arg in args:
         if arg in ['-h', '--help']:
-            print("Usage: check_svg_collisions.py [-v] file.svg [file2.svg ...]")
+            print("Usage: check_svg_collisions.py [-v] [--cache FILE] file.svg [file2.svg ...]")
             print("\nChecks SVG figures for problematic element interactions:")
             print("  1. Text overlapping text")
             print("  2. Lines passing through text")
@@ -49,9 +138,16 @@ def main():
             print("  4. Boxes overlapping (without containment)")
             print("  5. Lines passing through boxes")
             print("\n  -v, --verbose  Show element counts")
+            print("  --cache FILE   Reuse results for files unchanged since the last run")
+            print("                 (dbm may store FILE as FILE.db or FILE.dat/.dir/.bak)")
             return 0
         elif arg in ['-v', '--verbose']:
             verbose = True
+        elif arg == '--cache':
+            cache_path = next(args, None)
+            if cache_path is None:
+                print("--cache needs a file path")
+                return 1
         else:
             files.append(arg)
 
@@ -72,8 +168,7 @@ def main():
     total_warnings = 0
     total_missing_ids = 0
 
-    for filepath in files:
-        result = check_file(filepath)
+    for result in check_files(files, cache_path):
         issues = result['issues']
         warnings = result['warnings']
         missing_ids = result['missing_ids']
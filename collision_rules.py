@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Collision detection rules for SVG elements."""
 
+from geometry import overlapping_pairs, parallel_pairs
 from measure_text import measure_en_dash_width
+from spatial_index import GridIndex
 
 MIN_MARKER_SEGMENT_RATIO = 1.5  # segment must be at least 1.5x marker width
+LINE_BOX_MARGIN = 2.0  # widest tolerance used by Line box tests (corner touch)
+LINE_TEXT_MARGIN = 1.0  # tolerance of Line.intersects_box for line-through-text
 
 
 def nearest_gap(text, box) -> tuple:
@@ -12,28 +16,31 @@ def nearest_gap(text, box) -> tuple:
     Returns (gap, is_adjacent, direction) where direction is 'horizontal' or 'vertical'.
     Returns (None, False, None) if they're not adjacent (gap in both axes).
     """
+    tx_min, ty_min, tx_max, ty_max = text.x_min, text.y_min, text.x_max, text.y_max
+    bx_min, by_min, bx_max, by_max = box.x_min, box.y_min, box.x_max, box.y_max
+
     # Check overlap in each axis
-    x_overlap = text.x_max > box.x_min and box.x_max > text.x_min
-    y_overlap = text.y_max > box.y_min and box.y_max > text.y_min
+    x_overlap = tx_max > bx_min and bx_max > tx_min
+    y_overlap = ty_max > by_min and by_max > ty_min
 
     if x_overlap and y_overlap:
         return (0, True, None)  # actually overlapping
 
     if x_overlap:
         # They overlap in x, check y gap
-        gap_above = box.y_min - text.y_max  # text is above box
-        gap_below = text.y_min - box.y_max  # text is below box
+        gap_above = by_min - ty_max  # text is above box
         if gap_above > 0:
             return (gap_above, True, 'vertical')
+        gap_below = ty_min - by_max  # text is below box
         if gap_below > 0:
             return (gap_below, True, 'vertical')
 
     if y_overlap:
         # They overlap in y, check x gap
-        gap_left = box.x_min - text.x_max  # text is left of box
-        gap_right = text.x_min - box.x_max  # text is right of box
+        gap_left = bx_min - tx_max  # text is left of box
         if gap_left > 0:
             return (gap_left, True, 'horizontal')
+        gap_right = tx_min - bx_max  # text is right of box
         if gap_right > 0:
             return (gap_right, True, 'horizontal')
 
@@ -52,6 +59,9 @@ def check_collisions(texts, rects, lines, polygons, rendered_markers=None, marke
         markers = {}
 
     boxes = rects + polygons
+    box_index = GridIndex(boxes)
+    text_index = GridIndex(texts)
+    line_index = GridIndex(lines)
 
     # Rule 0: Lines with markers should have sufficient length
     for line in lines:
@@ -62,62 +72,77 @@ def check_collisions(texts, rects, lines, polygons, rendered_markers=None, marke
                 issues.append(("short marker segment", line.name, f"{line.length:.0f}px < {min_length:.0f}px"))
 
     # Rule 1: Text - Text: no overlap
-    for i, t1 in enumerate(texts):
-        for t2 in texts[i + 1:]:
-            if t1.overlaps(t2):
-                issues.append(("text overlap", t1.name, t2.name))
+    issues.extend(("text overlap", texts[i].name, texts[j].name) for i, j in overlapping_pairs(texts))
 
     # Rule 2: Text - Line: line must not pass through text
     for line in lines:
-        for text in texts:
+        for j in text_index.query_box(line, LINE_TEXT_MARGIN):
+            text = texts[j]
             if line.intersects_box(text):
                 issues.append(("line through text", line.name, text.name))
 
-    # Rule 3: Text - Box: text should not CROSS box borders
-    for text in texts:
-        for box in boxes:
-            if text.overlaps(box):
-                if box.contains(text):
+    # Rules 3 and 3b: Text - Box. Both look at the boxes near each text and skip nested
+    # pairs, so they share one candidate lookup and containment test per pair.
+    crossing = []
+    too_close = []
+    if boxes:
+        for text in texts:
+            has_font = text.font_family and text.font_size
+            min_gap_required = measure_en_dash_width(text.font_family, text.font_size) if has_font else 0.0
+            reach = max(min_gap_required, 0.0)
+            tx_min, ty_min, tx_max, ty_max = text.x_min, text.y_min, text.x_max, text.y_max
+            for j in box_index.query_box(text, reach):
+                box = boxes[j]
+                # Cheap reject: a box at least `reach` away on one side can neither overlap the
+                # text nor be too close. Right/below only count if nearest_gap would not measure
+                # a left/above gap first, which can happen for inverted boxes.
+                gap_left = box.x_min - tx_max
+                if gap_left >= reach or (tx_min - box.x_max >= reach and gap_left <= 0):
                     continue
-                if text.contains(box):
+                gap_above = box.y_min - ty_max
+                if gap_above >= reach or (ty_min - box.y_max >= reach and gap_above <= 0):
                     continue
-                issues.append(("text crosses box", text.name, box.name))
-
-    # Rule 3b: Text - Box: text should not be too close to box edge
-    for text in texts:
-        if not text.font_family or not text.font_size:
-            continue
-        min_gap_required = measure_en_dash_width(text.font_family, text.font_size)
-        for box in boxes:
-            if box.contains(text) or text.contains(box):
-                continue
-            gap, is_adjacent, direction = nearest_gap(text, box)
-            if is_adjacent and gap is not None and 0 < gap < min_gap_required:
-                dir_str = f" ({direction})" if direction else ""
-                issues.append(("text too close to box", text.name, f"{gap:.1f}px < {min_gap_required:.1f}px{dir_str}"))
+                if box.contains(text) or text.contains(box):
+                    continue
+                # Rule 3: text should not CROSS box borders
+                if text.overlaps(box):
+                    crossing.append(("text crosses box", text.name, box.name))
+                # Rule 3b: text should not be too close to box edge
+                if has_font:
+                    gap, is_adjacent, direction = nearest_gap(text, box)
+                    if is_adjacent and gap is not None and 0 < gap < min_gap_required:
+                        dir_str = f" ({direction})" if direction else ""
+                        too_close.append(("text too close to box", text.name, f"{gap:.1f}px < {min_gap_required:.1f}px{dir_str}"))
+    issues.extend(crossing)
+    issues.extend(too_close)
 
     # Rule 4: Box - Box: no overlap unless containment
-    for i, b1 in enumerate(boxes):
-        for b2 in boxes[i + 1:]:
-            if b1.overlaps(b2):
-                if not (b1.contains(b2) or b2.contains(b1)):
-                    issues.append(("box overlap", b1.name, b2.name))
+    issues.extend(
+        ("box overlap", boxes[i].name, boxes[j].name)
+        for i, j in overlapping_pairs(boxes)
+        if not (boxes[i].contains(boxes[j]) or boxes[j].contains(boxes[i]))
+    )
 
     # Rule 5: Line - Box: line must not pass through box
     for line in lines:
-        for box in boxes:
-            if line.passes_through_box(box):
+        for j in box_index.query_box(line, LINE_BOX_MARGIN):
+            box = boxes[j]
+            kind = line.classify_box(box)
+            if kind == 'through':
                 issues.append(("line through box", line.name, box.name))
-            elif line.touches_box_corner(box):
+            elif kind == 'corner':
                 warnings.append(("line touches corner", line.name, box.name))
 
     # Rule 6: Line - Marker: lines must not pass through rendered markers
     # Exception: lines starting/ending at marker tip going perpendicular are OK
     for owner_name, marker_box, tip_x, tip_y, dir_x, dir_y in rendered_markers:
-        for line in lines:
-            if line.name == owner_name or line.name.startswith(owner_name + "_seg"):
+        seg_prefix = owner_name + "_seg"  # segments of the same path as the marker's owner
+        for j in line_index.query_box(marker_box, LINE_BOX_MARGIN):
+            line = lines[j]
+            if line.name == owner_name or line.name.startswith(seg_prefix):
                 continue
-            if line.passes_through_box(marker_box):
+            kind = line.classify_box(marker_box)
+            if kind == 'through':
                 # Check if line starts or ends at the marker tip
                 eps = 2.0  # tolerance for "at the tip"
                 starts_at_tip = abs(line.x1 - tip_x) < eps and abs(line.y1 - tip_y) < eps
@@ -135,28 +160,34 @@ def check_collisions(texts, rects, lines, polygons, rendered_markers=None, marke
                         continue  # This is OK, not a collision
 
                 issues.append(("line through marker", line.name, marker_box.name))
-            elif line.touches_box_corner(marker_box):
+            elif kind == 'corner':
                 warnings.append(("line touches marker corner", line.name, marker_box.name))
 
+    # Rules 7 and 8 keep lines 3x their stroke width away from parallel lines and box edges
+    line_min_dist = [line.stroke_width * 3 for line in lines]
+
     # Rule 7: Parallel lines too close
-    for i, l1 in enumerate(lines):
-        for l2 in lines[i + 1:]:
-            if not l1.is_parallel_to(l2):
-                continue
-            if not l1.overlaps_in_direction(l2):
-                continue
-            dist = l1.perpendicular_distance_to(l2)
-            min_dist = max(l1.stroke_width, l2.stroke_width) * 3
-            if dist < min_dist:
-                issues.append(("parallel lines too close", l1.name, f"{l2.name} ({dist:.1f}px < {min_dist:.1f}px)"))
+    # Two lines are only reported within 3x the wider stroke, so exactly axis-aligned
+    # pairs further apart than 3x the widest stroke can be skipped up front.
+    max_offset = max(line_min_dist, default=0.0)
+    for i, j in parallel_pairs(lines, max_offset=max_offset):
+        l1, l2 = lines[i], lines[j]
+        if not l1.overlaps_in_direction(l2):
+            continue
+        dist = l1.perpendicular_distance_to(l2)
+        min_dist = max(line_min_dist[i], line_min_dist[j])
+        if dist < min_dist:
+            issues.append(("parallel lines too close", l1.name, f"{l2.name} ({dist:.1f}px < {min_dist:.1f}px)"))
 
     # Rule 8: Line too close to box edge
-    for line in lines:
-        for box in boxes:
+    for line, min_dist in zip(lines, line_min_dist):
+        if not (line.is_horizontal or line.is_vertical):
+            continue  # only axis-aligned lines can run parallel to a box edge
+        for j in box_index.query_box(line, min_dist):
+            box = boxes[j]
             dist = line.distance_to_box_edge(box)
             if dist is None:
                 continue
-            min_dist = line.stroke_width * 3
             if 0 < dist < min_dist:
                 issues.append(("line too close to box edge", line.name, f"{box.name} ({dist:.1f}px < {min_dist:.1f}px)"))
 
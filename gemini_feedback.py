@@ -4,18 +4,32 @@
 import os
 import sys
 import base64
+import hashlib
 import cairosvg
 from google import genai
 
 
+RENDER_SCALE = 2.0
+RENDER_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+
 def svg_to_png(svg_path: str, png_path: str) -> bytes:
     """Convert SVG file to PNG and save it."""
-    png_bytes = cairosvg.svg2png(url=svg_path, scale=2.0)
+    png_bytes = cairosvg.svg2png(url=svg_path, scale=RENDER_SCALE)
     with open(png_path, 'wb') as f:
         f.write(png_bytes)
     return png_bytes
 
 
+def render_cache_path(svg_path: str) -> str:
+    """Path of the cached render for the SVG's current contents and render settings."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(svg_path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(f"|cairosvg {cairosvg.__version__}|scale {RENDER_SCALE}".encode())
+    return os.path.join(RENDER_CACHE_DIR, digest.hexdigest() + '.png')
+
+
 def get_feedback(svg_path: str, api_key: str, model: str = "gemini-3-pro-preview") -> str:
     """
     Send SVG figure to Gemini and get improvement suggestions.
@@ -30,10 +44,24 @@ def get_feedback(svg_path: str, api_key: str, model: str = "gemini-3-pro-preview
     """
     client = genai.Client(api_key=api_key)
 
-    # Convert SVG to PNG for vision input
+    # Convert SVG to PNG for vision input. Renders are cached under a hash of the SVG's bytes,
+    # so an unchanged SVG is not rendered again; the PNG next to the SVG is always rewritten.
     png_path = svg_path.rsplit('.', 1)[0] + '.png'
-    png_bytes = svg_to_png(svg_path, png_path)
-    print(f"Created {os.path.basename(png_path)}")
+    cached_path = render_cache_path(svg_path)
+    if os.path.exists(cached_path):
+        with open(cached_path, 'rb') as f:
+            png_bytes = f.read()
+        with open(png_path, 'wb') as f:
+            f.write(png_bytes)
+        print(f"Created {os.path.basename(png_path)} (cached render)")
+    else:
+        png_bytes = svg_to_png(svg_path, png_path)
+        os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+        # Write to a temp name first so an interrupted run never leaves a truncated cache entry
+        with open(cached_path + '.tmp', 'wb') as f:
+            f.write(png_bytes)
+        os.replace(cached_path + '.tmp', cached_path)
+        print(f"Created {os.path.basename(png_path)}")
 
     prompt = "Give me frank feedback on this technical drawing."
 
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 """Geometric primitives for SVG collision detection."""
 
-from dataclasses import dataclass
+import math
+from bisect import bisect_right
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class BBox:
     x_min: float
     y_min: float
@@ -16,11 +18,9 @@ class BBox:
     font_size: float = None
 
     def overlaps(self, other: 'BBox', eps: float = 0.5) -> bool:
-        if self.x_max <= other.x_min + eps or other.x_max <= self.x_min + eps:
-            return False
-        if self.y_max <= other.y_min + eps or other.y_max <= self.y_min + eps:
-            return False
-        return True
+        # Negated so that a NaN coordinate counts as overlapping, as the rules have always reported it
+        return not (self.x_max <= other.x_min + eps or other.x_max <= self.x_min + eps or
+                    self.y_max <= other.y_min + eps or other.y_max <= self.y_min + eps)
 
     def contains(self, other: 'BBox') -> bool:
         return (self.x_min <= other.x_min and self.x_max >= other.x_max and
@@ -35,7 +35,50 @@ class BBox:
         return self.y_max - self.y_min
 
 
-@dataclass
+def overlapping_pairs(boxes: list, eps: float = 0.5) -> list:
+    """
+    Return (i, j) index pairs, i < j, of boxes that overlap, using the same test as BBox.overlaps.
+    Pairs come out in nested-loop order; candidates come from a sweep along x.
+    """
+    return _sweep_pairs(boxes, eps) if len(boxes) > 1 else []
+
+
+def _sweep_pairs(boxes: list, eps: float) -> list:
+    """Sweep-and-prune: visit boxes by x_min, only comparing against boxes whose x-range is still open."""
+    coords = [(b.x_min, b.y_min, b.x_max, b.y_max) for b in boxes]
+    # NaN would break the sort order the pruning relies on, so boxes with non-finite
+    # coordinates stay out of the sweep and are checked against every box instead
+    unsorted = [k for k, c in enumerate(coords) if not all(math.isfinite(v) for v in c)]
+    skip = set(unsorted)
+    order = sorted((k for k in range(len(coords)) if k not in skip), key=lambda k: coords[k][0])
+
+    pairs = []
+    for k in unsorted:
+        for other in range(len(boxes)):
+            if other in skip and other <= k:
+                continue  # pair of two unsorted boxes, already checked from the lower index
+            i, j = (k, other) if k < other else (other, k)
+            if boxes[i].overlaps(boxes[j], eps):
+                pairs.append((i, j))
+
+    active = []
+    for i in order:
+        ax_min, ay_min, ax_max, ay_max = coords[i]
+        # Boxes ending before this one starts cannot overlap it or anything after it
+        active = [k for k in active if coords[k][2] > ax_min + eps]
+        for k in active:
+            bx_min, by_min, bx_max, by_max = coords[k]
+            if ax_max <= bx_min + eps:
+                continue
+            if ay_max <= by_min + eps or by_max <= ay_min + eps:
+                continue
+            pairs.append((k, i) if k < i else (i, k))
+        active.append(i)
+    pairs.sort()
+    return pairs
+
+
+@dataclass(slots=True, eq=False)
 class Marker:
     id: str
     width: float
@@ -44,7 +87,7 @@ class Marker:
     ref_y: float
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class Line:
     x1: float
     y1: float
@@ -53,10 +96,38 @@ class Line:
     name: str
     marker_end_id: str = None
     stroke_width: float = 1.0
+    # Bounding box of the segment, cached so lines can go into a GridIndex like boxes
+    x_min: float = field(init=False, repr=False)
+    y_min: float = field(init=False, repr=False)
+    x_max: float = field(init=False, repr=False)
+    y_max: float = field(init=False, repr=False)
+    # Axis-aligned orientation, cached for the line-to-box-edge distance rule
+    is_horizontal: bool = field(init=False, repr=False)
+    is_vertical: bool = field(init=False, repr=False)
+    _direction: tuple = field(init=False, repr=False)
+    _length: float = field(default=None, init=False, repr=False)
+    _finite: bool = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.x_min = min(self.x1, self.x2)
+        self.y_min = min(self.y1, self.y2)
+        self.x_max = max(self.x1, self.x2)
+        self.y_max = max(self.y1, self.y2)
+        dx, dy = self.x2 - self.x1, self.y2 - self.y1
+        self._finite = math.isfinite(dx) and math.isfinite(dy)
+        length = (dx * dx + dy * dy) ** 0.5
+        self._direction = (0, 0) if length < 0.001 else (dx / length, dy / length)
+        dx, dy = self._direction
+        degenerate = dx == 0 and dy == 0
+        self.is_horizontal = not degenerate and abs(dy) < 0.001
+        self.is_vertical = not degenerate and abs(dx) < 0.001
 
     @property
     def length(self) -> float:
-        return ((self.x2 - self.x1) ** 2 + (self.y2 - self.y1) ** 2) ** 0.5
+        # Computed on first use, not in __post_init__: ** 2 overflows on huge coordinates
+        if self._length is None:
+            self._length = ((self.x2 - self.x1) ** 2 + (self.y2 - self.y1) ** 2) ** 0.5
+        return self._length
 
     def _point_at_box_edge(self, px: float, py: float, box: BBox, eps: float = 1.0) -> bool:
         """Check if point is at box edge (not deep inside)."""
@@ -70,112 +141,69 @@ class Line:
         near_bottom = abs(py - box.y_max) <= eps
         return near_left or near_right or near_top or near_bottom
 
-    def _segments_intersect(self, ax1, ay1, ax2, ay2, bx1, by1, bx2, by2) -> bool:
-        """Check if two line segments intersect using cross products."""
-        def cross(o, a, b):
-            return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
-
-        p1, p2 = (ax1, ay1), (ax2, ay2)
-        p3, p4 = (bx1, by1), (bx2, by2)
-
-        d1 = cross(p3, p4, p1)
-        d2 = cross(p3, p4, p2)
-        d3 = cross(p1, p2, p3)
-        d4 = cross(p1, p2, p4)
-
-        if ((d1 > 0 and d2 < 0) or (d1 < 0 and d2 > 0)) and \
-           ((d3 > 0 and d4 < 0) or (d3 < 0 and d4 > 0)):
-            return True
-        return False
-
     def _point_in_box(self, px, py, box: BBox, eps: float = 0.5) -> bool:
         """Check if point is strictly inside box (not on edge)."""
         return (box.x_min + eps < px < box.x_max - eps and
                 box.y_min + eps < py < box.y_max - eps)
 
     def intersects_box(self, box: BBox, eps: float = 1.0) -> bool:
-        """Check if line segment intersects box using Liang-Barsky clipping."""
-        dx = self.x2 - self.x1
-        dy = self.y2 - self.y1
-
-        t_min, t_max = 0.0, 1.0
-
-        # Check x bounds
-        if abs(dx) > 0.0001:
-            t1 = (box.x_min - eps - self.x1) / dx
-            t2 = (box.x_max + eps - self.x1) / dx
-            if t1 > t2:
-                t1, t2 = t2, t1
-            t_min = max(t_min, t1)
-            t_max = min(t_max, t2)
-        else:
-            if self.x1 < box.x_min - eps or self.x1 > box.x_max + eps:
-                return False
-
-        # Check y bounds
-        if abs(dy) > 0.0001:
-            t1 = (box.y_min - eps - self.y1) / dy
-            t2 = (box.y_max + eps - self.y1) / dy
-            if t1 > t2:
-                t1, t2 = t2, t1
-            t_min = max(t_min, t1)
-            t_max = min(t_max, t2)
-        else:
-            if self.y1 < box.y_min - eps or self.y1 > box.y_max + eps:
-                return False
-
-        return t_min <= t_max
+        """Check if line segment intersects box (grown by eps) using Liang-Barsky clipping."""
+        return self._clip_to_box(box, eps) is not None
 
     def _touches_corner(self, box: BBox, eps: float = 2.0) -> bool:
         """Check if line touches a box corner without passing through."""
-        corners = [
+        x1, y1 = self.x1, self.y1
+        dx, dy = self.x2 - x1, self.y2 - y1
+        if abs(dx) < 0.001 and abs(dy) < 0.001:
+            return False
+        corners = (
             (box.x_min, box.y_min), (box.x_max, box.y_min),
             (box.x_min, box.y_max), (box.x_max, box.y_max),
-        ]
-        for cx, cy in corners:
-            dx, dy = self.x2 - self.x1, self.y2 - self.y1
-            if abs(dx) < 0.001 and abs(dy) < 0.001:
-                continue
-            if abs(dx) > abs(dy):
-                t = (cx - self.x1) / dx
-                if 0 <= t <= 1:
-                    y_on_line = self.y1 + t * dy
-                    if abs(y_on_line - cy) < eps:
-                        return True
-            else:
-                t = (cy - self.y1) / dy
-                if 0 <= t <= 1:
-                    x_on_line = self.x1 + t * dx
-                    if abs(x_on_line - cx) < eps:
-                        return True
+        )
+        if abs(dx) > abs(dy):
+            # Mostly horizontal: parametrize by x
+            for cx, cy in corners:
+                t = (cx - x1) / dx
+                if 0 <= t <= 1 and abs(y1 + t * dy - cy) < eps:
+                    return True
+        else:
+            for cx, cy in corners:
+                t = (cy - y1) / dy
+                if 0 <= t <= 1 and abs(x1 + t * dx - cx) < eps:
+                    return True
         return False
 
-    def _clip_to_box(self, box: BBox) -> tuple:
-        """Return (t_min, t_max) for line clipped to box, or None if no intersection."""
+    def _clip_to_box(self, box: BBox, eps: float = 0.0) -> tuple:
+        """
+        Liang-Barsky clip against box grown by eps on every side.
+        Return (t_min, t_max) for the clipped part of the line, or None if no intersection.
+        """
         dx = self.x2 - self.x1
         dy = self.y2 - self.y1
         t_min, t_max = 0.0, 1.0
 
+        # Check x bounds
         if abs(dx) > 0.0001:
-            t1 = (box.x_min - self.x1) / dx
-            t2 = (box.x_max - self.x1) / dx
+            t1 = (box.x_min - eps - self.x1) / dx
+            t2 = (box.x_max + eps - self.x1) / dx
             if t1 > t2:
                 t1, t2 = t2, t1
             t_min = max(t_min, t1)
             t_max = min(t_max, t2)
         else:
-            if self.x1 < box.x_min or self.x1 > box.x_max:
+            if self.x1 < box.x_min - eps or self.x1 > box.x_max + eps:
                 return None
 
+        # Check y bounds
         if abs(dy) > 0.0001:
-            t1 = (box.y_min - self.y1) / dy
-            t2 = (box.y_max - self.y1) / dy
+            t1 = (box.y_min - eps - self.y1) / dy
+            t2 = (box.y_max + eps - self.y1) / dy
             if t1 > t2:
                 t1, t2 = t2, t1
             t_min = max(t_min, t1)
             t_max = min(t_max, t2)
         else:
-            if self.y1 < box.y_min or self.y1 > box.y_max:
+            if self.y1 < box.y_min - eps or self.y1 > box.y_max + eps:
                 return None
 
         if t_min > t_max:
@@ -184,6 +212,14 @@ class Line:
 
     def passes_through_box(self, box: BBox) -> bool:
         """Check if line crosses through box (not just touches corner/edge)."""
+        # Line's bbox strictly to one side of the box: the clip is empty or a single endpoint.
+        # Only safe with finite deltas, otherwise the clip parameters can come out as NaN.
+        if self._finite:
+            x_min, y_min, x_max, y_max = self.x_min, self.y_min, self.x_max, self.y_max
+            if ((x_max < box.x_min and x_max < box.x_max) or (x_min > box.x_min and x_min > box.x_max) or
+                    (y_max < box.y_min and y_max < box.y_max) or (y_min > box.y_min and y_min > box.y_max)):
+                return False
+
         clip = self._clip_to_box(box)
         if clip is None:
             return False
@@ -224,17 +260,22 @@ class Line:
 
     def touches_box_corner(self, box: BBox) -> bool:
         """Check if line touches box corner (warning, not error)."""
+        return self.classify_box(box) == 'corner'
+
+    def classify_box(self, box: BBox) -> str | None:
+        """
+        Classify how the line meets the box in one pass.
+        Return 'through' if it passes through, 'corner' if it only touches a corner, else None.
+        """
         if self.passes_through_box(box):
-            return False
-        return self._touches_corner(box)
+            return 'through'
+        if self._touches_corner(box):
+            return 'corner'
+        return None
 
     def direction(self) -> tuple:
-        """Return normalized direction vector (dx, dy)."""
-        dx, dy = self.x2 - self.x1, self.y2 - self.y1
-        length = (dx * dx + dy * dy) ** 0.5
-        if length < 0.001:
-            return (0, 0)
-        return (dx / length, dy / length)
+        """Return normalized direction vector (dx, dy), or (0, 0) for a degenerate line."""
+        return self._direction
 
     def is_parallel_to(self, other: 'Line', eps: float = 0.001) -> bool:
         """Check if two lines are exactly parallel (within floating point tolerance)."""
@@ -271,29 +312,94 @@ class Line:
         Calculate perpendicular distance to nearest parallel box edge.
         Returns None if line is not parallel to any box edge.
         """
-        dx, dy = self.direction()
-        if dx == 0 and dy == 0:
+        if self.is_horizontal:
+            if self.x_max > box.x_min and self.x_min < box.x_max:
+                return min(abs(self.y1 - box.y_min), abs(self.y1 - box.y_max))
             return None
-
-        is_horizontal = abs(dy) < 0.001
-        is_vertical = abs(dx) < 0.001
-
-        if not is_horizontal and not is_vertical:
+        if self.is_vertical:
+            if self.y_max > box.y_min and self.y_min < box.y_max:
+                return min(abs(self.x1 - box.x_min), abs(self.x1 - box.x_max))
             return None
-
-        if is_horizontal:
-            line_y = self.y1
-            line_min_x, line_max_x = min(self.x1, self.x2), max(self.x1, self.x2)
-            distances = []
-            if line_max_x > box.x_min and line_min_x < box.x_max:
-                distances.append(abs(line_y - box.y_min))
-                distances.append(abs(line_y - box.y_max))
-            return min(distances) if distances else None
-        else:
-            line_x = self.x1
-            line_min_y, line_max_y = min(self.y1, self.y2), max(self.y1, self.y2)
-            distances = []
-            if line_max_y > box.y_min and line_min_y < box.y_max:
-                distances.append(abs(line_x - box.x_min))
-                distances.append(abs(line_x - box.x_max))
-            return min(distances) if distances else None
+        return None
+
+
+def parallel_pairs(lines: list, eps: float = 0.001, max_offset: float = None) -> list:
+    """
+    Return (i, j) index pairs, i < j, of lines that are parallel according to Line.is_parallel_to.
+    Pairs come out in nested-loop order. Lines are bucketed by direction angle modulo pi, with
+    buckets wider than the largest angle the test accepts, so each line only needs comparing
+    against its own and the two neighbouring buckets.
+
+    If max_offset is given, pairs of exactly horizontal (or exactly vertical) lines whose
+    perpendicular distance is max_offset or more are left out. For such lines that distance
+    is just the difference in y (or x), so they are kept sorted by it and only near ones visited.
+    """
+    if max_offset is not None and math.isnan(max_offset):
+        max_offset = None
+    n_buckets = max(1, int(math.pi / (2 * math.asin(min(eps, 1.0)))))
+    buckets = {}
+    line_bucket = []
+    line_axis = []  # 'h' / 'v' for exactly axis-aligned lines when pruning by offset
+    for i, line in enumerate(lines):
+        dx, dy = line.direction()
+        if (dx == 0 and dy == 0) or math.isnan(dx) or math.isnan(dy):
+            line_bucket.append(None)  # degenerate or non-finite lines are never parallel
+            line_axis.append(None)
+            continue
+        angle = math.atan2(dy, dx) % math.pi
+        key = min(int(angle * n_buckets / math.pi), n_buckets - 1)
+        buckets.setdefault(key, []).append(i)
+        line_bucket.append(key)
+        axis = None
+        if max_offset is not None:
+            if line.y1 == line.y2:
+                axis = 'h'
+            elif line.x1 == line.x2:
+                axis = 'v'
+        line_axis.append(axis)
+
+    # Exactly axis-aligned lines, sorted by their offset across the axis
+    rows = {'h': [], 'v': []}
+    for i, axis in enumerate(line_axis):
+        if axis == 'h':
+            rows['h'].append((lines[i].y1, i))
+        elif axis == 'v':
+            rows['v'].append((lines[i].x1, i))
+    row_pos = {}
+    for axis, row in rows.items():
+        row.sort()
+        for pos, (_, i) in enumerate(row):
+            row_pos[i] = pos
+
+    pairs = []
+    for i, key in enumerate(line_bucket):
+        if key is None:
+            continue
+        axis = line_axis[i]
+        candidates = []
+        for k in {(key - 1) % n_buckets, key, (key + 1) % n_buckets}:
+            bucket = buckets.get(k)
+            if bucket:
+                for j in bucket[bisect_right(bucket, i):]:
+                    if axis is None or line_axis[j] != axis:
+                        candidates.append(j)
+        if axis is not None:
+            row = rows[axis]
+            pos = row_pos[i]
+            offset = row[pos][0]
+            k = pos - 1
+            while k >= 0 and offset - row[k][0] < max_offset:
+                if row[k][1] > i:
+                    candidates.append(row[k][1])
+                k -= 1
+            k = pos + 1
+            while k < len(row) and row[k][0] - offset < max_offset:
+                if row[k][1] > i:
+                    candidates.append(row[k][1])
+                k += 1
+        candidates.sort()
+        line = lines[i]
+        for j in candidates:
+            if line.is_parallel_to(lines[j], eps):
+                pairs.append((i, j))
+    return pairs
@@ -1,36 +1,54 @@
 #!/usr/bin/env python3
 """Measure text dimensions using Cairo."""
 
+from functools import lru_cache
+
 import cairocffi as cairo
 
 
+# One scratch surface and context, reused for every measurement
+_surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
+_ctx = cairo.Context(_surface)
+_ctx_font = None  # (font_family, font_size) currently selected on _ctx
+
+
+def _use_font(font_family: str, font_size: float):
+    """Select the font on the shared context, unless it is already selected."""
+    global _ctx_font
+    if _ctx_font != (font_family, font_size):
+        _ctx.select_font_face(font_family, cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_NORMAL)
+        _ctx.set_font_size(font_size)
+        _ctx_font = (font_family, font_size)
+
+
+@lru_cache(maxsize=128)
+def _font_extents(font_family: str, font_size: float) -> tuple:
+    """Return (height, ascent, descent) of the font."""
+    _use_font(font_family, font_size)
+    # font_extents returns: (ascent, descent, height, max_x_advance, max_y_advance)
+    font_extents = _ctx.font_extents()
+    return font_extents[2], font_extents[0], font_extents[1]
+
+
+@lru_cache(maxsize=4096)
 def measure_text(text: str, font_family: str, font_size: float) -> tuple:
     """
     Measure text width and height using Cairo.
     Returns (width, height, ascent, descent).
+    Results are cached, since figures tend to repeat the same labels and fonts.
     """
-    # Create a dummy surface just for measuring
-    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
-    ctx = cairo.Context(surface)
-
-    # Set font
-    ctx.select_font_face(font_family, cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_NORMAL)
-    ctx.set_font_size(font_size)
+    _use_font(font_family, font_size)
 
     # Get text extents
     # text_extents returns: (x_bearing, y_bearing, width, height, x_advance, y_advance)
-    extents = ctx.text_extents(text)
-    # font_extents returns: (ascent, descent, height, max_x_advance, max_y_advance)
-    font_extents = ctx.font_extents()
+    extents = _ctx.text_extents(text)
+    height, ascent, descent = _font_extents(font_family, font_size)
 
     width = extents[2]  # width
-    height = font_extents[2]  # height
-    ascent = font_extents[0]  # ascent
-    descent = font_extents[1]  # descent
-
     return width, height, ascent, descent
 
 
+@lru_cache(maxsize=128)
 def measure_en_dash_width(font_family: str, font_size: float) -> float:
     """Measure the width of an en-dash for the given font."""
     width, _, _, _ = measure_text('–', font_family, font_size)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Uniform grid spatial index for bounding-box candidate queries."""
+
+import math
+
+LARGE_BOX_CELLS = 64  # boxes spanning more cells than this are kept in a list instead
+
+
+class GridIndex:
+    """
+    Buckets boxes into a uniform grid so queries only look at nearby boxes.
+    Queries return a superset of the boxes touching the query rectangle;
+    callers still run the exact collision test on each candidate.
+    """
+
+    def __init__(self, boxes: list, cell_size: float = None):
+        self.boxes = boxes
+        self.cells = {}
+        self.unindexed = []  # boxes with non-finite coordinates, always returned
+        self.large = []  # (index, coords) of boxes too big to copy into every cell they cover
+
+        # Boxes may be inverted (e.g. a rect with negative width); index the area they span.
+        # Boxes with any non-finite coordinate get None and are always returned instead.
+        coords = []
+        for b in boxes:
+            x_min, y_min, x_max, y_max = b.x_min, b.y_min, b.x_max, b.y_max
+            if all(math.isfinite(v) for v in (x_min, y_min, x_max, y_max)):
+                coords.append((min(x_min, x_max), min(y_min, y_max), max(x_min, x_max), max(y_min, y_max)))
+            else:
+                coords.append(None)
+        finite = [c for c in coords if c is not None]
+
+        # Combined extent of the indexed boxes, for a cheap early-out in query()
+        if finite:
+            self.extent = (min(c[0] for c in finite), min(c[1] for c in finite),
+                           max(c[2] for c in finite), max(c[3] for c in finite))
+        else:
+            self.extent = None
+
+        if cell_size is None:
+            cell_size = self._default_cell_size(self.extent, finite)
+        self.cell_size = cell_size
+
+        for idx, c in enumerate(coords):
+            if c is None:
+                self.unindexed.append(idx)
+                continue
+            cx0, cy0, cx1, cy1 = self._cell_range(*c)
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > LARGE_BOX_CELLS:
+                self.large.append((idx, c))
+                continue
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self.cells.setdefault((cx, cy), []).append(idx)
+
+    @staticmethod
+    def _default_cell_size(extent: tuple, coords: list) -> float:
+        """
+        Pick a cell size from the typical box size, so most boxes fall into a few cells,
+        but never so small that the extent is split into many more cells than there are boxes.
+        """
+        if extent is None:
+            return 1.0
+        sizes = sorted(max(c[2] - c[0], c[3] - c[1]) for c in coords)
+        median_size = sizes[len(sizes) // 2]
+        spread_size = max(extent[2] - extent[0], extent[3] - extent[1]) / max(1, int(len(coords) ** 0.5))
+        size = max(median_size, spread_size)
+        return size if size > 0 else 1.0
+
+    def _cell_range(self, x_min, y_min, x_max, y_max) -> tuple:
+        cell = self.cell_size
+        return (int(x_min // cell), int(y_min // cell),
+                int(x_max // cell), int(y_max // cell))
+
+    def query(self, x_min: float, y_min: float, x_max: float, y_max: float) -> list:
+        """Return indices of candidate boxes near the rectangle, in ascending order."""
+        if not all(math.isfinite(v) for v in (x_min, y_min, x_max, y_max)):
+            return list(range(len(self.boxes)))
+        # The query rectangle may be inverted too; look up the area it spans
+        x_min, x_max = min(x_min, x_max), max(x_min, x_max)
+        y_min, y_max = min(y_min, y_max), max(y_min, y_max)
+
+        extent = self.extent
+        if (extent is None or x_max < extent[0] or y_max < extent[1]
+                or x_min > extent[2] or y_min > extent[3]):
+            return list(self.unindexed)
+
+        cx0, cy0, cx1, cy1 = self._cell_range(x_min, y_min, x_max, y_max)
+        found = set(self.unindexed)
+        for idx, (bx_min, by_min, bx_max, by_max) in self.large:
+            if bx_max >= x_min and bx_min <= x_max and by_max >= y_min and by_min <= y_max:
+                found.add(idx)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            # Query covers more cells than are occupied - scan the occupied ones instead
+            for (cx, cy), bucket in self.cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    found.update(bucket)
+        else:
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    bucket = self.cells.get((cx, cy))
+                    if bucket:
+                        found.update(bucket)
+        return sorted(found)
+
+    def query_box(self, box, margin: float = 0.0) -> list:
+        """Return candidate indices for a box, grown by margin on every side."""
+        return self.query(box.x_min - margin, box.y_min - margin,
+                          box.x_max + margin, box.y_max + margin)
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 """SVG parsing and element extraction."""
 
+import io
 import math
 import re
-import xml.etree.ElementTree as ET
+from xml.parsers import expat
 
 from geometry import BBox, Marker, Line
 from measure_text import measure_text_bbox
@@ -11,146 +12,79 @@ from measure_text import measure_text_bbox
 
 def parse_points(points_str: str) -> list:
     """Parse SVG points attribute into list of (x, y) tuples."""
-    points = []
     parts = points_str.replace(',', ' ').split()
-    for i in range(0, len(parts) - 1, 2):
-        points.append((float(parts[i]), float(parts[i + 1])))
-    return points
+    values = list(map(float, parts[:len(parts) - len(parts) % 2]))  # drop an unpaired trailing value
+    return list(zip(values[0::2], values[1::2]))
+
+
+FONT_SIZE_RE = re.compile(r'([0-9.]+)')
+
+# Number of arguments taken by each path command. Apart from H/V, the segment
+# endpoint is always the last coordinate pair; control points are ignored.
+PATH_COMMAND_ARGS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'Z': 0, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7}
+PATH_TOKEN_RE = re.compile(r'[MmLlHhVvZzCcSsQqTtAa]|[-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?')
 
 
 def parse_path_to_lines(d: str) -> list:
     """Parse SVG path d attribute and return list of (x1, y1, x2, y2) line segments."""
     lines = []
-    tokens = re.findall(r'[MmLlHhVvZzCcSsQqTtAa]|[-+]?[0-9]*\.?[0-9]+', d)
+    tokens = PATH_TOKEN_RE.findall(d)
+    n_tokens = len(tokens)
 
     i = 0
     current_x, current_y = 0.0, 0.0
     start_x, start_y = 0.0, 0.0
 
-    while i < len(tokens):
+    while i < n_tokens:
         cmd = tokens[i]
         i += 1
+        upper = cmd.upper()
+        arg_count = PATH_COMMAND_ARGS.get(upper)
 
-        if cmd in 'Mm':
-            if i + 1 < len(tokens):
-                x, y = float(tokens[i]), float(tokens[i + 1])
-                i += 2
-                if cmd == 'm':
-                    current_x += x
-                    current_y += y
-                else:
-                    current_x, current_y = x, y
-                start_x, start_y = current_x, current_y
-
-        elif cmd in 'Ll':
-            if i + 1 < len(tokens):
-                x, y = float(tokens[i]), float(tokens[i + 1])
-                i += 2
-                prev_x, prev_y = current_x, current_y
-                if cmd == 'l':
-                    current_x += x
-                    current_y += y
-                else:
-                    current_x, current_y = x, y
-                lines.append((prev_x, prev_y, current_x, current_y))
-
-        elif cmd in 'Hh':
-            if i < len(tokens):
-                x = float(tokens[i])
-                i += 1
-                prev_x = current_x
-                if cmd == 'h':
-                    current_x += x
-                else:
-                    current_x = x
-                lines.append((prev_x, current_y, current_x, current_y))
-
-        elif cmd in 'Vv':
-            if i < len(tokens):
-                y = float(tokens[i])
-                i += 1
-                prev_y = current_y
-                if cmd == 'v':
-                    current_y += y
-                else:
-                    current_y = y
-                lines.append((current_x, prev_y, current_x, current_y))
-
-        elif cmd in 'Zz':
-            if current_x != start_x or current_y != start_y:
-                lines.append((current_x, current_y, start_x, start_y))
-            current_x, current_y = start_x, start_y
-
-        elif cmd in 'Cc':
-            if i + 5 < len(tokens):
-                if cmd == 'c':
-                    end_x = current_x + float(tokens[i + 4])
-                    end_y = current_y + float(tokens[i + 5])
-                else:
-                    end_x = float(tokens[i + 4])
-                    end_y = float(tokens[i + 5])
-                i += 6
-                lines.append((current_x, current_y, end_x, end_y))
-                current_x, current_y = end_x, end_y
-
-        elif cmd in 'Ss':
-            if i + 3 < len(tokens):
-                if cmd == 's':
-                    end_x = current_x + float(tokens[i + 2])
-                    end_y = current_y + float(tokens[i + 3])
-                else:
-                    end_x = float(tokens[i + 2])
-                    end_y = float(tokens[i + 3])
-                i += 4
-                lines.append((current_x, current_y, end_x, end_y))
-                current_x, current_y = end_x, end_y
-
-        elif cmd in 'Qq':
-            if i + 3 < len(tokens):
-                if cmd == 'q':
-                    end_x = current_x + float(tokens[i + 2])
-                    end_y = current_y + float(tokens[i + 3])
-                else:
-                    end_x = float(tokens[i + 2])
-                    end_y = float(tokens[i + 3])
-                i += 4
-                lines.append((current_x, current_y, end_x, end_y))
-                current_x, current_y = end_x, end_y
-
-        elif cmd in 'Tt':
-            if i + 1 < len(tokens):
-                if cmd == 't':
-                    end_x = current_x + float(tokens[i])
-                    end_y = current_y + float(tokens[i + 1])
-                else:
-                    end_x = float(tokens[i])
-                    end_y = float(tokens[i + 1])
-                i += 2
-                lines.append((current_x, current_y, end_x, end_y))
-                current_x, current_y = end_x, end_y
-
-        elif cmd in 'Aa':
-            if i + 6 < len(tokens):
-                if cmd == 'a':
-                    end_x = current_x + float(tokens[i + 5])
-                    end_y = current_y + float(tokens[i + 6])
-                else:
-                    end_x = float(tokens[i + 5])
-                    end_y = float(tokens[i + 6])
-                i += 7
-                lines.append((current_x, current_y, end_x, end_y))
-                current_x, current_y = end_x, end_y
-        else:
+        if arg_count is None:
+            # Bare number outside a command: treat it and the next token as an absolute lineto
             try:
                 x = float(cmd)
-                if i < len(tokens):
+                if i < n_tokens:
                     y = float(tokens[i])
                     i += 1
-                    prev_x, prev_y = current_x, current_y
+                    lines.append((current_x, current_y, x, y))
                     current_x, current_y = x, y
-                    lines.append((prev_x, prev_y, current_x, current_y))
             except ValueError:
                 pass
+            continue
+
+        if upper == 'Z':
+            if current_x != start_x or current_y != start_y:
+                lines.append((current_x, current_y, start_x, start_y))
+            current_x, current_y = start_x, start_y
+            continue
+
+        if i + arg_count > n_tokens:
+            continue
+        relative = cmd != upper
+        prev_x, prev_y = current_x, current_y
+
+        if upper == 'H':
+            x = float(tokens[i])
+            current_x = current_x + x if relative else x
+        elif upper == 'V':
+            y = float(tokens[i])
+            current_y = current_y + y if relative else y
+        else:
+            x = float(tokens[i + arg_count - 2])
+            y = float(tokens[i + arg_count - 1])
+            if relative:
+                current_x += x
+                current_y += y
+            else:
+                current_x, current_y = x, y
+        i += arg_count
+
+        if upper == 'M':
+            start_x, start_y = current_x, current_y
+        else:
+            lines.append((prev_x, prev_y, current_x, current_y))
 
     return lines
 
@@ -192,85 +126,73 @@ def compute_marker_bbox(line, marker):
     # Perpendicular vector (90° counter-clockwise)
     px, py = -uy, ux
 
-    # Marker corners in local coords (before rotation):
-    # Origin at (0,0), extends to (width, height) after scaling
-    # ref_x, ref_y is the attachment point placed at line endpoint
-    corners_local = [
-        (0, 0),
-        (width, 0),
-        (width, height),
-        (0, height),
-    ]
-
-    # Transform each corner to global coords
+    # Marker corners in local coords (before rotation) are (0,0), (width,0), (width,height), (0,height):
+    # origin at (0,0), and ref_x, ref_y is the attachment point placed at line endpoint.
+    # Each corner pairs one of two x offsets with one of two y offsets from the ref point,
+    # so the rotated offsets are computed once per axis and the four corners are unrolled.
+    off_x0, off_x1 = 0 - ref_x, width - ref_x
+    off_y0, off_y1 = 0 - ref_y, height - ref_y
+
+    # Transform to global coords
     # Local x-axis maps to line direction (ux, uy)
     # Local y-axis maps to perpendicular (px, py)
     # Offset so ref_x, ref_y lands at (line.x2, line.y2)
-    global_corners = []
-    for lx, ly in corners_local:
-        # Offset from ref point in local coords
-        off_x = lx - ref_x
-        off_y = ly - ref_y
-        # Transform to global
-        gx = line.x2 + off_x * ux + off_y * px
-        gy = line.y2 + off_x * uy + off_y * py
-        global_corners.append((gx, gy))
+    ax0, ax1 = off_x0 * ux, off_x1 * ux
+    ay0, ay1 = off_x0 * uy, off_x1 * uy
+    bx0, bx1 = off_y0 * px, off_y1 * px
+    by0, by1 = off_y0 * py, off_y1 * py
+    x2, y2 = line.x2, line.y2
+    xs = (x2 + ax0 + bx0, x2 + ax1 + bx0, x2 + ax1 + bx1, x2 + ax0 + bx1)
+    ys = (y2 + ay0 + by0, y2 + ay1 + by0, y2 + ay1 + by1, y2 + ay0 + by1)
 
     # Compute axis-aligned bounding box
-    xs = [c[0] for c in global_corners]
-    ys = [c[1] for c in global_corners]
-
     return (BBox(
         min(xs), min(ys), max(xs), max(ys),
         f"{line.name}:marker", 'marker'
     ), line.x2, line.y2, ux, uy)
 
 
-def find_element_line_numbers(svg_path: str) -> dict:
-    """Pre-scan SVG to map element tags to line numbers."""
-    line_map = {}
-    tag_counts = {}
-
-    with open(svg_path, 'r') as f:
-        for line_num, line in enumerate(f, 1):
-            for match in re.finditer(r'<(\w+)(?:\s|>|/)', line):
-                tag = match.group(1)
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-                line_map[(tag, tag_counts[tag])] = line_num
-
-    return line_map
+def marker_end_id(attrs: dict) -> str | None:
+    """Return the marker id referenced by an element's marker-end="url(#id)", if any."""
+    marker_end = attrs.get('marker-end', '')
+    if marker_end.startswith('url(#') and marker_end.endswith(')'):
+        return marker_end[5:-1]
+    return None
 
 
 def extract_elements(svg_path: str, warn_missing_ids: bool = True) -> tuple:
     """Extract all elements from SVG file."""
-    tree = ET.parse(svg_path)
-    root = tree.getroot()
+    with open(svg_path, 'rb') as f:
+        return _extract_elements(f, warn_missing_ids)
 
-    line_map = find_element_line_numbers(svg_path)
-    tag_counts = {}
 
-    ns = {'svg': 'http://www.w3.org/2000/svg'}
-    if root.tag.startswith('{'):
-        ns_uri = root.tag[1:root.tag.index('}')]
-        ns = {'svg': ns_uri}
+def extract_elements_from_string(svg_text: str, warn_missing_ids: bool = True) -> tuple:
+    """Extract all elements from SVG markup held in memory."""
+    # The text is already decoded, so any encoding in its XML declaration no longer applies
+    return _extract_elements(io.BytesIO(svg_text.encode('utf-8')), warn_missing_ids, encoding='utf-8')
 
+
+def _extract_elements(svg_file, warn_missing_ids: bool, encoding: str = None) -> tuple:
+    """
+    Extract all elements from an SVG document read from a binary file object.
+    If encoding is given it overrides the one in the document's XML declaration.
+    """
     texts = []
     rects = []
     lines = []
     polygons = []
+    markers = {}
     missing_id_warnings = []
 
     elem_counter = 0
 
-    def get_name(elem, tag, skip_warning=False):
+    def get_name(attrs, tag, line_num, skip_warning=False):
         nonlocal elem_counter
         elem_counter += 1
 
-        tag_counts[tag] = tag_counts.get(tag, 0) + 1
-        line_num = line_map.get((tag, tag_counts[tag]), '?')
-
-        if elem.get('id'):
-            return elem.get('id')
+        elem_id = attrs.get('id')
+        if elem_id:
+            return elem_id
         else:
             temp_name = f"elem_{elem_counter}"
             if warn_missing_ids and not skip_warning and tag in ('rect', 'line', 'path', 'polygon', 'polyline', 'text'):
@@ -279,101 +201,120 @@ def extract_elements(svg_path: str, warn_missing_ids: bool = True) -> tuple:
                 )
             return temp_name
 
-    defs_elements = set()
-    markers = {}
-    for defs in root.iter():
-        defs_tag = defs.tag.split('}')[-1] if '}' in defs.tag else defs.tag
-        if defs_tag == 'defs':
-            for child in defs.iter():
-                defs_elements.add(child)
-                child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if child_tag == 'marker':
-                    marker_id = child.get('id')
-                    if marker_id:
-                        markers[marker_id] = Marker(
-                            id=marker_id,
-                            width=float(child.get('markerWidth', 10)),
-                            height=float(child.get('markerHeight', 7)),
-                            ref_x=float(child.get('refX', 0)),
-                            ref_y=float(child.get('refY', 0)),
-                        )
-
-    for elem in root.iter():
-        tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-        in_defs = elem in defs_elements
-        name = get_name(elem, tag, skip_warning=in_defs)
-
-        if in_defs:
-            continue
-
-        if tag == 'text':
-            x = float(elem.get('x', 0))
-            y = float(elem.get('y', 0))
-            text_content = elem.text or ''
-
-            font_family = elem.get('font-family', 'sans-serif')
-            font_size = 12.0
-            fs_attr = elem.get('font-size', '12')
-            if fs_attr:
-                fs_match = re.match(r'([0-9.]+)', fs_attr)
-                if fs_match:
-                    font_size = float(fs_match.group(1))
-
-            anchor = elem.get('text-anchor', 'start')
-
-            x_min, y_min, x_max, y_max = measure_text_bbox(
-                text_content, x, y, font_family, font_size, anchor
-            )
-
-            bbox = BBox(x_min, y_min, x_max, y_max, text_content[:20] or name, 'text',
-                        font_family=font_family, font_size=font_size)
-            texts.append(bbox)
-
-        elif tag == 'rect':
-            x = float(elem.get('x', 0))
-            y = float(elem.get('y', 0))
-            w = float(elem.get('width', 0))
-            h = float(elem.get('height', 0))
-            bbox = BBox(x, y, x + w, y + h, name, 'rect')
-            rects.append(bbox)
-
-        elif tag == 'line':
-            x1 = float(elem.get('x1', 0))
-            y1 = float(elem.get('y1', 0))
-            x2 = float(elem.get('x2', 0))
-            y2 = float(elem.get('y2', 0))
-            marker_end_id = None
-            marker_end = elem.get('marker-end', '')
-            if marker_end.startswith('url(#') and marker_end.endswith(')'):
-                marker_end_id = marker_end[5:-1]
-            stroke_width = float(elem.get('stroke-width', 1))
-            line = Line(x1, y1, x2, y2, name, marker_end_id, stroke_width)
-            lines.append(line)
-
-        elif tag == 'polygon' or tag == 'polyline':
-            points_str = elem.get('points', '')
-            if points_str:
-                points = parse_points(points_str)
-                if points:
-                    xs = [p[0] for p in points]
-                    ys = [p[1] for p in points]
-                    bbox = BBox(min(xs), min(ys), max(xs), max(ys), name, 'polygon')
-                    polygons.append(bbox)
-
-        elif tag == 'path':
-            d = elem.get('d', '')
-            if d:
-                marker_end_id = None
-                marker_end = elem.get('marker-end', '')
-                if marker_end.startswith('url(#') and marker_end.endswith(')'):
-                    marker_end_id = marker_end[5:-1]
-                stroke_width = float(elem.get('stroke-width', 1))
-                path_segments = parse_path_to_lines(d)
-                for idx, (x1, y1, x2, y2) in enumerate(path_segments):
-                    segment_name = f"{name}_seg{idx}" if len(path_segments) > 1 else name
-                    seg_marker = marker_end_id if idx == len(path_segments) - 1 else None
-                    line = Line(x1, y1, x2, y2, segment_name, seg_marker, stroke_width)
-                    lines.append(line)
+    def handle_text(attrs, text_content, name):
+        x = float(attrs.get('x', 0))
+        y = float(attrs.get('y', 0))
+
+        font_family = attrs.get('font-family', 'sans-serif')
+        font_size = 12.0
+        fs_attr = attrs.get('font-size', '12')
+        if fs_attr:
+            fs_match = FONT_SIZE_RE.match(fs_attr)
+            if fs_match:
+                font_size = float(fs_match.group(1))
+
+        anchor = attrs.get('text-anchor', 'start')
+
+        x_min, y_min, x_max, y_max = measure_text_bbox(
+            text_content, x, y, font_family, font_size, anchor
+        )
+
+        bbox = BBox(x_min, y_min, x_max, y_max, text_content[:20] or name, 'text',
+                    font_family=font_family, font_size=font_size)
+        texts.append(bbox)
+
+    def handle_rect(attrs, text_content, name):
+        x = float(attrs.get('x', 0))
+        y = float(attrs.get('y', 0))
+        w = float(attrs.get('width', 0))
+        h = float(attrs.get('height', 0))
+        rects.append(BBox(x, y, x + w, y + h, name, 'rect'))
+
+    def handle_line(attrs, text_content, name):
+        x1 = float(attrs.get('x1', 0))
+        y1 = float(attrs.get('y1', 0))
+        x2 = float(attrs.get('x2', 0))
+        y2 = float(attrs.get('y2', 0))
+        stroke_width = float(attrs.get('stroke-width', 1))
+        lines.append(Line(x1, y1, x2, y2, name, marker_end_id(attrs), stroke_width))
+
+    def handle_polygon(attrs, text_content, name):
+        points_str = attrs.get('points', '')
+        if points_str:
+            points = parse_points(points_str)
+            if points:
+                xs, ys = zip(*points)
+                polygons.append(BBox(min(xs), min(ys), max(xs), max(ys), name, 'polygon'))
+
+    def handle_path(attrs, text_content, name):
+        d = attrs.get('d', '')
+        if d:
+            end_marker = marker_end_id(attrs)
+            stroke_width = float(attrs.get('stroke-width', 1))
+            path_segments = parse_path_to_lines(d)
+            for idx, (x1, y1, x2, y2) in enumerate(path_segments):
+                segment_name = f"{name}_seg{idx}" if len(path_segments) > 1 else name
+                seg_marker = end_marker if idx == len(path_segments) - 1 else None
+                lines.append(Line(x1, y1, x2, y2, segment_name, seg_marker, stroke_width))
+
+    handlers = {
+        'text': handle_text,
+        'rect': handle_rect,
+        'line': handle_line,
+        'polygon': handle_polygon,
+        'polyline': handle_polygon,
+        'path': handle_path,
+    }
+
+    # Stream the document with expat: names and line numbers are taken at the start tag,
+    # elements are handled at the end tag once their text (up to the first child) is known.
+    parser = expat.ParserCreate(encoding, namespace_separator='}')
+    parser.buffer_text = True
+    stack = []  # (tag, attrs, name, text_parts) for each open element
+    text_parts = None  # text list of the innermost element still before its first child
+    defs_depth = 0
+
+    def start_element(raw_tag, attrs):
+        nonlocal defs_depth, text_parts
+        tag = raw_tag.rsplit('}', 1)[-1]
+        if tag == 'defs':
+            defs_depth += 1
+        name = get_name(attrs, tag, parser.CurrentLineNumber, skip_warning=defs_depth > 0)
+        text_parts = []
+        stack.append((tag, attrs, name, text_parts))
+
+    def end_element(raw_tag):
+        nonlocal defs_depth, text_parts
+        tag, attrs, name, parts = stack.pop()
+        text_parts = None
+
+        if defs_depth > 0:
+            if tag == 'marker':
+                marker_id = attrs.get('id')
+                if marker_id:
+                    markers[marker_id] = Marker(
+                        id=marker_id,
+                        width=float(attrs.get('markerWidth', 10)),
+                        height=float(attrs.get('markerHeight', 7)),
+                        ref_x=float(attrs.get('refX', 0)),
+                        ref_y=float(attrs.get('refY', 0)),
+                    )
+            elif tag == 'defs':
+                defs_depth -= 1
+            return
+
+        handler = handlers.get(tag)
+        if handler:
+            handler(attrs, ''.join(parts), name)
+
+    def character_data(data):
+        if text_parts is not None:
+            text_parts.append(data)
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+    parser.ParseFile(svg_file)
 
     rendered_markers = []
     for line in lines:
@@ -1,33 +1,40 @@
 #!/usr/bin/env python3
 """Tests for SVG collision detection."""
 
-import tempfile
-import os
-from check_svg_collisions import check_file
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
 
-def write_svg(content: str) -> str:
-    """Write SVG content to a temp file and return path."""
-    fd, path = tempfile.mkstemp(suffix='.svg')
-    with os.fdopen(fd, 'w') as f:
-        f.write(f'''<?xml version="1.0" encoding="UTF-8"?>
+SVG_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
 <svg xmlns="http://www.w3.org/2000/svg" width="200" height="200" viewBox="0 0 200 200">
-{content}
-</svg>''')
-    return path
+'''
+SVG_FOOTER = '''
+</svg>'''
 
 
-def test_case(name: str, svg_content: str, expected: str):
-    """Run a test case and print result.
+def wrap_svg(content: str) -> str:
+    """Wrap SVG content in a 200x200 document."""
+    return SVG_HEADER + content + SVG_FOOTER
+
+
+def check_case(case: tuple) -> dict:
+    """Check a case's SVG content. Runs in a worker process."""
+    # Imported here so importing this module (e.g. for pytest collection) stays cheap
+    from check_svg_collisions import check_string
+    section, name, svg_content, expected = case
+    return check_string(wrap_svg(svg_content))
+
+
+def format_case(name: str, expected: str, result: dict) -> tuple:
+    """Format a case's result. Returns (passed, report text).
 
     expected: 'issues', 'warnings', or 'clean'
     """
-    path = write_svg(svg_content)
-    result = check_file(path)
-    os.unlink(path)
-
-    has_issues = len(result['issues']) > 0
-    has_warnings = len(result['warnings']) > 0
+    issues = result['issues']
+    warnings = result['warnings']
+    has_issues = bool(issues)
+    has_warnings = bool(warnings)
 
     if expected == 'issues':
         passed = has_issues
@@ -39,293 +46,238 @@ def test_case(name: str, svg_content: str, expected: str):
     status = "PASS" if passed else "FAIL"
     counts = []
     if has_issues:
-        counts.append(f"{len(result['issues'])} issues")
+        counts.append(f"{len(issues)} issues")
     if has_warnings:
-        counts.append(f"{len(result['warnings'])} warnings")
+        counts.append(f"{len(warnings)} warnings")
     count_str = f" ({', '.join(counts)})" if counts else ""
 
-    print(f"  {status}: {name} - expected {expected}{count_str}")
+    out = [f"  {status}: {name} - expected {expected}{count_str}\n"]
     if not passed:
-        for issue in result['issues']:
-            print(f"        issue: {issue}")
-        for warning in result['warnings']:
-            print(f"        warning: {warning}")
-    return passed
+        for issue in issues:
+            out.append(f"        issue: {issue}\n")
+        for warning in warnings:
+            out.append(f"        warning: {warning}\n")
+    return passed, ''.join(out)
 
 
-def main():
-    passed = 0
-    failed = 0
-
-    print("\n=== Text ↔ Text ===")
-
+# (section, name, svg_content, expected); expected is 'issues', 'warnings', or 'clean'
+CASES = [
     # Should trigger: overlapping text
-    if test_case("overlapping text",
+    ("Text ↔ Text", "overlapping text",
         '''<text x="50" y="50" font-size="20">Hello</text>
            <text x="60" y="50" font-size="20">World</text>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: separate text
-    if test_case("separate text",
+    ("Text ↔ Text", "separate text",
         '''<text x="10" y="50" font-size="12">Hello</text>
            <text x="100" y="50" font-size="12">World</text>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
-
-    print("\n=== Text ↔ Line ===")
+        'clean'),
 
     # Should trigger: line through text
-    if test_case("line through text",
+    ("Text ↔ Line", "line through text",
         '''<text x="50" y="50" font-size="20">Hello</text>
            <line x1="0" y1="50" x2="200" y2="50" stroke="black"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: line misses text
-    if test_case("line misses text",
+    ("Text ↔ Line", "line misses text",
         '''<text x="50" y="50" font-size="12">Hello</text>
            <line x1="0" y1="100" x2="200" y2="100" stroke="black"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
-
-    print("\n=== Text ↔ Box ===")
+        'clean'),
 
     # Should trigger: text crosses box border
-    if test_case("text crosses box border",
+    ("Text ↔ Box", "text crosses box border",
         '''<rect x="50" y="30" width="50" height="50"/>
            <text x="40" y="50" font-size="20">Hello</text>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: text fully inside box
-    if test_case("text inside box",
+    ("Text ↔ Box", "text inside box",
         '''<rect x="10" y="10" width="180" height="180"/>
            <text x="50" y="100" font-size="12">Hello</text>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: text fully outside box
-    if test_case("text outside box",
+    ("Text ↔ Box", "text outside box",
         '''<rect x="100" y="100" width="50" height="50"/>
            <text x="10" y="50" font-size="12">Hello</text>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should trigger: text too close to box edge (less than en-dash width)
     # Text "Hello" ends around x=38, box starts at x=40, gap ~2px < 6.7px en-dash
-    if test_case("text too close to box",
+    ("Text ↔ Box", "text too close to box",
         '''<rect x="40" y="10" width="100" height="100"/>
            <text x="10" y="60" font-size="12">Hello</text>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: text far enough from box edge
     # Text "Hello" ends around x=38, box starts at x=50, gap ~12px > 6.7px en-dash
-    if test_case("text adequate distance from box",
+    ("Text ↔ Box", "text adequate distance from box",
         '''<rect x="50" y="10" width="100" height="100"/>
            <text x="10" y="60" font-size="12">Hello</text>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
-
-    print("\n=== Box ↔ Box ===")
+        'clean'),
 
     # Should trigger: overlapping boxes (no containment)
-    if test_case("overlapping boxes",
+    ("Box ↔ Box", "overlapping boxes",
         '''<rect x="10" y="10" width="80" height="80"/>
            <rect x="50" y="50" width="80" height="80"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: one box contains other
-    if test_case("nested boxes (containment)",
+    ("Box ↔ Box", "nested boxes (containment)",
         '''<rect x="10" y="10" width="180" height="180"/>
            <rect x="50" y="50" width="50" height="50"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: separate boxes
-    if test_case("separate boxes",
+    ("Box ↔ Box", "separate boxes",
         '''<rect x="10" y="10" width="40" height="40"/>
            <rect x="100" y="100" width="40" height="40"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
-    print("\n=== Line ↔ Box ===")
+    # Should trigger: a rect with negative width (here x=60..100) overlapping a wider box
+    ("Box ↔ Box", "overlapping boxes, one with negative width",
+        '''<rect id="box1" x="100" y="10" width="-40" height="80"/>
+           <rect id="box2" x="40" y="50" width="80" height="60"/>''',
+        'issues'),
+
+    # Should trigger: a rect with a NaN position must not hide the overlap of two other rects
+    ("Box ↔ Box", "overlapping boxes next to a box with NaN position",
+        '''<rect id="box1" x="80" y="0" width="20" height="20"/>
+           <rect id="box2" x="nan" y="0" width="10" height="10"/>
+           <rect id="box3" x="85" y="5" width="30" height="10"/>''',
+        'issues'),
 
     # Should trigger: line passes through box (both endpoints outside)
-    if test_case("line passes through box",
+    ("Line ↔ Box", "line passes through box",
         '''<rect x="50" y="50" width="50" height="50"/>
            <line x1="0" y1="75" x2="200" y2="75" stroke="black"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: line misses box
-    if test_case("line misses box",
+    ("Line ↔ Box", "line misses box",
         '''<rect x="50" y="50" width="50" height="50"/>
            <line x1="0" y1="10" x2="200" y2="10" stroke="black"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: line connects to box edge
-    if test_case("line connects to box edge",
+    ("Line ↔ Box", "line connects to box edge",
         '''<rect x="50" y="50" width="50" height="50"/>
            <line x1="0" y1="75" x2="50" y2="75" stroke="black"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: line fully contained inside box (e.g., legend samples)
-    if test_case("line inside box",
+    ("Line ↔ Box", "line inside box",
         '''<rect x="10" y="10" width="180" height="180"/>
            <line x1="50" y1="100" x2="150" y2="100" stroke="black"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: diagonal line misses box (bounding boxes overlap but line doesn't intersect)
     # This was causing false positives in fig1 - line from (160,230) to (110,280) vs box at (150,280)
-    if test_case("diagonal line misses box (bbox overlap)",
+    ("Line ↔ Box", "diagonal line misses box (bbox overlap)",
         '''<rect x="150" y="280" width="100" height="50"/>
            <line x1="160" y1="230" x2="110" y2="280" stroke="black"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should trigger warning: line grazes box corner without entering interior
     # Line from (0,100) to (100,0) passes through corner (50,50) but stays outside
-    if test_case("line grazes box corner",
+    ("Line ↔ Box", "line grazes box corner",
         '''<rect x="50" y="50" width="50" height="50"/>
            <line x1="0" y1="100" x2="100" y2="0" stroke="black"/>''',
-        expected='warnings'):
-        passed += 1
-    else:
-        failed += 1
+        'warnings'),
 
     # Should trigger: diagonal from corner to corner passes through interior
-    if test_case("diagonal corner-to-corner through interior",
+    ("Line ↔ Box", "diagonal corner-to-corner through interior",
         '''<rect x="50" y="50" width="50" height="50"/>
            <line x1="25" y1="25" x2="125" y2="125" stroke="black"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should trigger: diagonal line through box interior
-    if test_case("diagonal line through box interior",
+    ("Line ↔ Box", "diagonal line through box interior",
         '''<rect x="50" y="50" width="50" height="50"/>
            <line x1="0" y1="60" x2="120" y2="90" stroke="black"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should trigger: path crosses box via edge nodes (enters left edge, exits right edge)
     # This tests that even with nodes exactly on the edges, crossing through is detected
-    if test_case("path crosses box via edge nodes",
+    ("Line ↔ Box", "path crosses box via edge nodes",
         '''<rect x="50" y="50" width="50" height="50"/>
            <path d="M 25 75 L 50 75 L 100 75 L 125 75" stroke="black" fill="none"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
-    print("\n=== Defs Handling ===")
+    # Should trigger: path coordinates in exponent notation are parsed as single numbers
+    ("Line ↔ Box", "path with exponent coordinates",
+        '''<rect x="50" y="50" width="50" height="50"/>
+           <path d="M 2.5e1 75 L 1.25e2 75" stroke="black" fill="none"/>''',
+        'issues'),
+
+    # Should trigger: boxes spread over the figure fall into different grid cells,
+    # the line crosses only the box in the far corner
+    ("Line ↔ Box", "line through box far from other boxes",
+        '''<rect id="box1" x="5" y="5" width="10" height="10"/>
+           <rect id="box2" x="185" y="5" width="10" height="10"/>
+           <rect id="box3" x="5" y="185" width="10" height="10"/>
+           <rect id="box4" x="180" y="180" width="10" height="10"/>
+           <line id="line1" x1="170" y1="185" x2="198" y2="185" stroke="black"/>''',
+        'issues'),
+
+    # Should trigger: a box covering many small ones is kept outside the grid cells,
+    # a line crossing its border must still be found
+    ("Line ↔ Box", "line through large box around many small boxes",
+        '<rect id="frame" x="0" y="0" width="190" height="190"/>\n' +
+        '\n'.join(f'<rect id="cell{i}_{j}" x="{10 + 18 * i}" y="{10 + 18 * j}" width="4" height="4"/>'
+                  for i in range(10) for j in range(10)) +
+        '\n<line id="line1" x1="100" y1="198" x2="100" y2="180" stroke="black"/>',
+        'issues'),
 
     # Should NOT trigger: elements inside <defs> should be ignored
     # This was causing false positives - arrowhead markers were being checked for collisions
-    if test_case("elements in defs are ignored",
+    ("Defs Handling", "elements in defs are ignored",
         '''<defs>
              <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
                <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
              </marker>
            </defs>
            <line x1="0" y1="3" x2="100" y2="3" stroke="black"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
-
-    print("\n=== Short Marker Segments ===")
+        'clean'),
 
     # Should trigger: arrow segment too short for marker
     # Line is 10px, marker is 10px, min = 10 * 1.5 = 15px
-    if test_case("short marker segment",
+    ("Short Marker Segments", "short marker segment",
         '''<defs>
              <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
                <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
              </marker>
            </defs>
            <line id="arrow1" x1="0" y1="50" x2="10" y2="50" stroke="black" marker-end="url(#arrowhead)"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: arrow segment long enough
-    if test_case("adequate marker segment",
+    ("Short Marker Segments", "adequate marker segment",
         '''<defs>
              <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
                <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
              </marker>
            </defs>
            <line id="arrow1" x1="0" y1="50" x2="25" y2="50" stroke="black" marker-end="url(#arrowhead)"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should trigger: stroke-width scales the marker, so line needs to be longer
     # Line is 25px, marker is 10 * stroke-width(2) = 20px, min = 20 * 1.5 = 30px
-    if test_case("short marker segment with stroke-width scaling",
+    ("Short Marker Segments", "short marker segment with stroke-width scaling",
         '''<defs>
              <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
                <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
              </marker>
            </defs>
            <line id="arrow1" x1="0" y1="50" x2="25" y2="50" stroke="black" stroke-width="2" marker-end="url(#arrowhead)"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
-
-    print("\n=== Marker Collisions ===")
+        'issues'),
 
     # Should trigger: line passes through rendered arrowhead marker
     # Arrow ends at (100, 50), arrowhead extends back to x≈91 (refX=9 of 10 width)
     # Line 2 at x=95 crosses through the middle of the arrowhead
-    if test_case("line through arrowhead marker",
+    ("Marker Collisions", "line through arrowhead marker",
         '''<defs>
              <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
                <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
@@ -333,17 +285,14 @@ def main():
            </defs>
            <line id="arrow1" x1="0" y1="50" x2="100" y2="50" stroke="black" marker-end="url(#arrowhead)"/>
            <line id="line2" x1="95" y1="0" x2="95" y2="100" stroke="black"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should trigger: line through VERTICAL arrow's marker (tests rotation + stroke-width scaling)
     # Arrow points down, ends at (100, 100) with stroke-width=2
     # Marker (10x7) scales to 20x14, rotates so it extends from y≈82 to y≈102
     # Horizontal line at y=90 should cut through it
     # OLD BUG: without rotation/scaling, bbox would be y≈96.5-103.5, missing y=90
-    if test_case("line through vertical arrow marker",
+    ("Marker Collisions", "line through vertical arrow marker",
         '''<defs>
              <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
                <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
@@ -351,13 +300,10 @@ def main():
            </defs>
            <line id="arrow1" x1="100" y1="0" x2="100" y2="100" stroke="black" stroke-width="2" marker-end="url(#arrowhead)"/>
            <line id="line2" x1="0" y1="90" x2="200" y2="90" stroke="black"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: line misses arrowhead marker
-    if test_case("line misses arrowhead marker",
+    ("Marker Collisions", "line misses arrowhead marker",
         '''<defs>
              <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
                <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
@@ -365,13 +311,10 @@ def main():
            </defs>
            <line id="arrow1" x1="0" y1="50" x2="100" y2="50" stroke="black" marker-end="url(#arrowhead)"/>
            <line id="line2" x1="50" y1="0" x2="50" y2="100" stroke="black"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: arrow pointing into a box (marker overlaps target box intentionally)
-    if test_case("arrow into box is OK",
+    ("Marker Collisions", "arrow into box is OK",
         '''<defs>
              <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
                <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
@@ -379,15 +322,12 @@ def main():
            </defs>
            <rect id="target-box" x="100" y="25" width="80" height="50"/>
            <line id="arrow1" x1="0" y1="50" x2="100" y2="50" stroke="black" marker-end="url(#arrowhead)"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: line starting at marker tip going perpendicular
     # Arrow points right ending at (100, 50), second line starts there going down
     # This is a valid connection pattern (two arrows meeting at a point)
-    if test_case("perpendicular line from marker tip is OK",
+    ("Marker Collisions", "perpendicular line from marker tip is OK",
         '''<defs>
              <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
                <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
@@ -395,86 +335,111 @@ def main():
            </defs>
            <line id="arrow1" x1="0" y1="50" x2="100" y2="50" stroke="black" stroke-width="2" marker-end="url(#arrowhead)"/>
            <line id="line2" x1="100" y1="50" x2="100" y2="150" stroke="black" stroke-width="2"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
-    print("\n=== Parallel Lines ===")
+    # Should trigger: zero-length arrow with negative stroke-width gives an inverted marker box
+    # (x 130..110, y 57..43); the diagonal line crosses it and a grid cell boundary at x=120
+    ("Marker Collisions", "line through inverted marker box",
+        '''<defs>
+             <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">
+               <polygon points="0 0, 10 3.5, 0 7" fill="#333"/>
+             </marker>
+           </defs>
+           <line id="arrow1" x1="120" y1="50" x2="120" y2="50" stroke="black" stroke-width="-2" marker-end="url(#arrowhead)"/>
+           <line id="line2" x1="100" y1="40" x2="140" y2="60" stroke="black"/>''',
+        'issues'),
 
     # Should trigger: two parallel lines too close (1px apart, need 3px min for stroke-width 1)
-    if test_case("parallel lines too close",
+    ("Parallel Lines", "parallel lines too close",
         '''<line id="line1" x1="10" y1="50" x2="100" y2="50" stroke="black" stroke-width="1"/>
            <line id="line2" x1="10" y1="51" x2="100" y2="51" stroke="black" stroke-width="1"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: parallel lines far enough apart (5px apart, 3px min)
-    if test_case("parallel lines adequate distance",
+    ("Parallel Lines", "parallel lines adequate distance",
         '''<line id="line1" x1="10" y1="50" x2="100" y2="50" stroke="black" stroke-width="1"/>
            <line id="line2" x1="10" y1="55" x2="100" y2="55" stroke="black" stroke-width="1"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: parallel lines don't overlap in projection
-    if test_case("parallel lines non-overlapping range",
+    ("Parallel Lines", "parallel lines non-overlapping range",
         '''<line id="line1" x1="10" y1="50" x2="50" y2="50" stroke="black" stroke-width="1"/>
            <line id="line2" x1="60" y1="51" x2="100" y2="51" stroke="black" stroke-width="1"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: non-parallel lines close together
-    if test_case("non-parallel lines close",
+    ("Parallel Lines", "non-parallel lines close",
         '''<line id="line1" x1="10" y1="50" x2="100" y2="50" stroke="black"/>
            <line id="line2" x1="10" y1="51" x2="100" y2="60" stroke="black"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
-
-    print("\n=== Line to Box Edge ===")
+        'clean'),
 
     # Should trigger: horizontal line too close to box edge (1px gap, need 3px for stroke-width 1)
-    if test_case("line too close to box edge",
+    ("Line to Box Edge", "line too close to box edge",
         '''<rect id="box1" x="50" y="50" width="100" height="50"/>
            <line id="line1" x1="60" y1="49" x2="140" y2="49" stroke="black" stroke-width="1"/>''',
-        expected='issues'):
-        passed += 1
-    else:
-        failed += 1
+        'issues'),
 
     # Should NOT trigger: line far enough from box edge (5px gap)
-    if test_case("line adequate distance from box edge",
+    ("Line to Box Edge", "line adequate distance from box edge",
         '''<rect id="box1" x="50" y="50" width="100" height="50"/>
            <line id="line1" x1="60" y1="45" x2="140" y2="45" stroke="black" stroke-width="1"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: diagonal line near box (not parallel to edge)
-    if test_case("diagonal line near box edge",
+    ("Line to Box Edge", "diagonal line near box edge",
         '''<rect id="box1" x="50" y="50" width="100" height="50"/>
            <line id="line1" x1="60" y1="45" x2="140" y2="48" stroke="black"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
 
     # Should NOT trigger: line doesn't overlap box in projection
-    if test_case("line outside box range",
+    ("Line to Box Edge", "line outside box range",
         '''<rect id="box1" x="50" y="50" width="100" height="50"/>
            <line id="line1" x1="10" y1="49" x2="40" y2="49" stroke="black" stroke-width="1"/>''',
-        expected='clean'):
-        passed += 1
-    else:
-        failed += 1
+        'clean'),
+]
+
+
+def pytest_generate_tests(metafunc):
+    """Under pytest, run test_collision once per case, without importing pytest here."""
+    if 'case' in metafunc.fixturenames:
+        metafunc.parametrize('case', CASES, ids=[name for _, name, _, _ in CASES])
+
+
+def test_collision(case):
+    section, name, svg_content, expected = case
+    passed, report = format_case(name, expected, check_case(case))
+    print(report, end='')
+    assert passed, f"{name}: expected {expected}"
+
+
+def main():
+    passed = 0
+    failed = 0
+
+    # Cases are independent, so they are checked in worker processes and reported in order.
+    # On Linux, import the checker once here and fork the workers so they inherit it. Other
+    # platforms keep their default start method: fork is unsafe on macOS once Cairo is loaded.
+    mp_context = None
+    if sys.platform.startswith('linux'):
+        import check_svg_collisions  # noqa: F401 - imported only so forked workers inherit it
+        mp_context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(mp_context=mp_context) as executor:
+        results = list(executor.map(check_case, CASES, chunksize=4))
+
+    # Collect the report and write it in one go rather than printing line by line
+    out = []
+    section = None
+    for (case_section, name, _, expected), result in zip(CASES, results):
+        if case_section != section:
+            section = case_section
+            out.append(f"\n=== {section} ===\n")
+        case_passed, report = format_case(name, expected, result)
+        out.append(report)
+        if case_passed:
+            passed += 1
+        else:
+            failed += 1
+    sys.stdout.write(''.join(out))
 
     print(f"\n{'='*40}")
     print(f"Results: {passed} passed, {failed} failed")